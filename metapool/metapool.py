@@ -5,12 +5,29 @@ import string
 import seaborn as sns
 import matplotlib.pyplot as plt
 import warnings
+from io import StringIO
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, without it the jitted helpers run as plain Python
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
 
 
 REVCOMP_SEQUENCERS = ['HiSeq4000', 'MiniSeq', 'NextSeq', 'HiSeq3000',
                       'iSeq', 'NovaSeq']
 OTHER_SEQUENCERS = ['HiSeq2500', 'HiSeq1500', 'MiSeq']
 
+# translation table used to complement sequences in rc; any other character
+# is left as is
+_RC_TABLE = str.maketrans('ACGT', 'TGCA')
+
+# characters that are not allowed in bcl2fastq sample names
+_BCL_SCRUB_PATTERN = re.compile(r'[^0-9a-zA-Z\-\_]+')
+
 
 def read_plate_map_csv(f, sep='\t'):
     """
@@ -35,22 +52,23 @@ def read_plate_map_csv(f, sep='\t'):
     """
 
     plate_df = pd.read_csv(f, sep=sep)
-    plate_df['Well'] = plate_df['Row'] + plate_df['Col'].map(str)
+    plate_df['Well'] = plate_df['Row'] + plate_df['Col'].astype(str)
 
-    null_samples = plate_df.Sample.isnull()
+    null_samples = plate_df['Sample'].isna()
     if null_samples.any():
         warnings.warn(('This plate map contains %d empty wells, these will be '
                       'ignored') % null_samples.sum())
 
         # slice to the non-null samples and reset the index so samples are
         # still indexed with a continuous list of integers
-        plate_df = plate_df[~null_samples]
-        plate_df.reset_index(inplace=True, drop=True)
+        plate_df = plate_df.loc[~null_samples].reset_index(drop=True)
 
-    duplicated_samples = plate_df.Sample[plate_df.Sample.duplicated()]
+    # names that appear more than once
+    sample_counts = plate_df['Sample'].value_counts(sort=False)
+    duplicated_samples = sample_counts.index[sample_counts.to_numpy() > 1]
     if len(duplicated_samples):
         raise ValueError('The following sample names are duplicated %s' %
-                         ', '.join(sorted(duplicated_samples)))
+                         ', '.join(sorted(duplicated_samples.astype(str))))
 
     return plate_df
 
@@ -84,11 +102,19 @@ def read_pico_csv(f, sep='\t', plate_reader='Synergy_HT',
         encoding, skipfooter = 'utf-16', 15
     else:
         raise ValueError("Invalid plate reader %s" % plate_reader)
-    if not hasattr(f, 'read'):
-        f = open(f, encoding=encoding)
+    if hasattr(f, 'read'):
+        contents = f.read()
+    else:
+        with open(f, encoding=encoding) as fh:
+            contents = fh.read()
+    if isinstance(contents, bytes):
+        contents = contents.decode(encoding or 'utf-8')
+
+    # skipfooter is only supported by the slow python parsing engine, so trim
+    # the footer here and let the C engine parse the rest
+    contents = '\n'.join(contents.splitlines()[:-skipfooter])
 
-    pico_df = pd.read_csv(f, sep=sep, skiprows=2,
-                          skipfooter=skipfooter, engine='python')
+    pico_df = pd.read_csv(StringIO(contents), sep=sep, skiprows=2)
 
     # synergy's concentration column is "Concentration", spectramax's is
     # [Concentration]. Rename will ignore any labels not in the dataframe so
@@ -106,6 +132,28 @@ def read_pico_csv(f, sep='\t', plate_reader='Synergy_HT',
     return pico_df
 
 
+def _column_major(values):
+    """Lays out 2D arrays in column-major (Fortran) order
+
+    Plate arrays are commonly wrapped in a DataFrame and then reduced per
+    column, which is faster when each column is contiguous in memory.
+
+    Parameters
+    ----------
+    values : numpy array
+        The values to return
+
+    Returns
+    -------
+    numpy array
+        The same values, in Fortran order if `values` is a 2D array
+    """
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        values = np.asfortranarray(values)
+
+    return values
+
+
 def calculate_norm_vol(dna_concs, ng=5, min_vol=2.5, max_vol=3500,
                        resolution=2.5):
     """
@@ -127,13 +175,44 @@ def calculate_norm_vol(dna_concs, ng=5, min_vol=2.5, max_vol=3500,
     sample_vols : numpy array of float
         The volumes to pool (nL)
     """
-    sample_vols = ng / np.nan_to_num(dna_concs) * 1000
+    # computed in place on a float copy of the concentrations
+    sample_vols = np.array(dna_concs, dtype=float)
+    np.nan_to_num(sample_vols, copy=False)
+
+    np.divide(ng, sample_vols, out=sample_vols)
+    sample_vols *= 1000
 
-    sample_vols = np.clip(sample_vols, min_vol, max_vol)
+    np.clip(sample_vols, min_vol, max_vol, out=sample_vols)
 
-    sample_vols = np.round(sample_vols / resolution) * resolution
+    sample_vols /= resolution
+    np.round(sample_vols, out=sample_vols)
+    sample_vols *= resolution
 
-    return(sample_vols)
+    return(_column_major(sample_vols))
+
+
+def _ravel_for_csv(values):
+    """Flattens a pick list column, keeping None written as "None"
+
+    to_csv writes None and NaN alike as its na_rep, pick lists write None
+    as "None", e.g. for the empty wells of make_2D_array(..., dtype=object).
+
+    Parameters
+    ----------
+    values : array-like
+        The column values
+
+    Returns
+    -------
+    np.array
+        The flattened values
+    """
+    values = np.ravel(values)
+    if values.dtype == object:
+        is_none = np.equal(values, None)
+        if is_none.any():
+            values = np.where(is_none, 'None', values)
+    return values
 
 
 def format_dna_norm_picklist(dna_vols, water_vols, wells, dest_wells=None,
@@ -183,43 +262,59 @@ def format_dna_norm_picklist(dna_vols, water_vols, wells, dest_wells=None,
         sample_names = np.empty(dna_vols.shape) * np.nan
     if sample_plates is None:
         sample_plates = 'Sample'
-    if isinstance(sample_plates, str):
-        sample_plates = np.full_like(dna_vols, sample_plates, dtype=object)
     if dna_plate_type is None:
         dna_plate_type = '384PP_AQ_BP2_HT'
-    if isinstance(dna_plate_type, str):
-        dna_plate_type = np.full_like(dna_vols, dna_plate_type, dtype=object)
     if dna_concs is None:
         dna_concs = np.empty(dna_vols.shape) * np.nan
     if (dna_concs.shape != sample_names.shape != dna_vols.shape
-       != sample_plates.shape != dna_plate_type.shape):
+       != np.shape(sample_plates) != np.shape(dna_plate_type)):
         raise ValueError(('dna_vols %r has a size different from dna_concs %r'
                           ' or sample_names %r') %
                          (dna_vols.shape, dna_concs.shape, sample_names.shape))
 
-    picklist = ''
-
     # header
-    picklist += ('Sample\tSource Plate Name\tSource Plate Type\tSource Well\t'
-                 'Concentration\tTransfer Volume\tDestination Plate Name\t'
-                 'Destination Well')
+    picklist = ['Sample\tSource Plate Name\tSource Plate Type\tSource Well\t'
+                'Concentration\tTransfer Volume\tDestination Plate Name\t'
+                'Destination Well\n']
+
+    # flatten the plate arrays into pick list columns
+    wells = _ravel_for_csv(wells)
+    dest_wells = _ravel_for_csv(dest_wells)
+    sample_names = _ravel_for_csv(sample_names)
+    dna_concs = _ravel_for_csv(dna_concs)
+    water_vols = _ravel_for_csv(water_vols)
+    dna_vols = _ravel_for_csv(dna_vols)
+
+    # a single plate name or type is broadcast by pandas to every row
+    if not isinstance(sample_plates, str):
+        sample_plates = _ravel_for_csv(sample_plates)
+    if not isinstance(dna_plate_type, str):
+        dna_plate_type = _ravel_for_csv(dna_plate_type)
 
     # water additions
-    for index, sample in np.ndenumerate(sample_names):
-        picklist += '\n' + '\t'.join([str(sample), water_plate_name,
-                                      water_plate_type, str(wells[index]),
-                                      str(dna_concs[index]),
-                                      str(water_vols[index]),
-                                      dest_plate_name, str(dest_wells[index])])
+    water_df = pd.DataFrame({'Sample': sample_names,
+                             'Source Plate Name': water_plate_name,
+                             'Source Plate Type': water_plate_type,
+                             'Source Well': wells,
+                             'Concentration': dna_concs,
+                             'Transfer Volume': water_vols,
+                             'Destination Plate Name': dest_plate_name,
+                             'Destination Well': dest_wells})
     # DNA additions
-    for index, sample in np.ndenumerate(sample_names):
-        picklist += '\n' + '\t'.join([str(sample), str(sample_plates[index]),
-                                      str(dna_plate_type[index]),
-                                      str(wells[index]), str(dna_concs[index]),
-                                      str(dna_vols[index]),
-                                      dest_plate_name, str(dest_wells[index])])
+    dna_df = pd.DataFrame({'Sample': sample_names,
+                           'Source Plate Name': sample_plates,
+                           'Source Plate Type': dna_plate_type,
+                           'Source Well': wells,
+                           'Concentration': dna_concs,
+                           'Transfer Volume': dna_vols,
+                           'Destination Plate Name': dest_plate_name,
+                           'Destination Well': dest_wells})
+
+    for df in (water_df, dna_df):
+        picklist.append(df.to_csv(sep='\t', header=False, index=False,
+                                  na_rep='nan', lineterminator='\n'))
 
-    return(picklist)
+    return(''.join(picklist).rstrip('\n'))
 
 
 def assign_index(samples, index_df, start_idx=0):
@@ -275,33 +370,42 @@ def format_index_picklist(sample_names, sample_wells, indices,
                           'sample_wells (%s) or index list (%s)') %
                          (len(sample_names), len(sample_wells), len(indices)))
 
-    picklist = ''
-
     # header
-    picklist += ('Sample\tSource Plate Name\tSource Plate Type\tSource Well\t'
-                 'Transfer Volume\tIndex Name\tIndex Sequence\tIndex Combo\t'
-                 'Destination Plate Name\tDestination Well')
+    picklist = ['Sample\tSource Plate Name\tSource Plate Type\tSource Well\t'
+                'Transfer Volume\tIndex Name\tIndex Sequence\tIndex Combo\t'
+                'Destination Plate Name\tDestination Well']
+
+    # string versions of the non-string fields
+    sample_names = np.asarray(sample_names).astype(str)
+    sample_wells = np.asarray(sample_wells).astype(str)
+    i5_vol = str(i5_vol)
+    i7_vol = str(i7_vol)
+
+    # index columns
+    index_combo = indices['index combo'].to_numpy().astype(str)
+    i5_plate = indices['i5 plate'].to_numpy()
+    i5_well = indices['i5 well'].to_numpy()
+    i5_name = indices['i5 name'].to_numpy()
+    i5_sequence = indices['i5 sequence'].to_numpy()
+    i7_plate = indices['i7 plate'].to_numpy()
+    i7_well = indices['i7 well'].to_numpy()
+    i7_name = indices['i7 name'].to_numpy()
+    i7_sequence = indices['i7 sequence'].to_numpy()
 
     # i5 additions
     for i, (sample, well) in enumerate(zip(sample_names, sample_wells)):
-        picklist += '\n' + '\t'.join([str(sample), indices.iloc[i]['i5 plate'],
-                                      i5_plate_type,
-                                      indices.iloc[i]['i5 well'], str(
-                                          i5_vol), indices.iloc[i]['i5 name'],
-                                      indices.iloc[i]['i5 sequence'], str(
-                                          indices.iloc[i]['index combo']),
-                                      dest_plate_name, well])
+        picklist.append('\t'.join([sample, i5_plate[i], i5_plate_type,
+                                   i5_well[i], i5_vol, i5_name[i],
+                                   i5_sequence[i], index_combo[i],
+                                   dest_plate_name, well]))
     # i7 additions
     for i, (sample, well) in enumerate(zip(sample_names, sample_wells)):
-        picklist += '\n' + '\t'.join([str(sample), indices.iloc[i]['i7 plate'],
-                                      i7_plate_type,
-                                      indices.iloc[i]['i7 well'], str(
-                                          i7_vol), indices.iloc[i]['i7 name'],
-                                      indices.iloc[i]['i7 sequence'], str(
-                                          indices.iloc[i]['index combo']),
-                                      dest_plate_name, well])
+        picklist.append('\t'.join([sample, i7_plate[i], i7_plate_type,
+                                   i7_well[i], i7_vol, i7_name[i],
+                                   i7_sequence[i], index_combo[i],
+                                   dest_plate_name, well]))
 
-    return(picklist)
+    return('\n'.join(picklist))
 
 
 def compute_qpcr_concentration(cp_vals, m=-3.231, b=12.059, dil_factor=25000):
@@ -325,9 +429,15 @@ def compute_qpcr_concentration(cp_vals, m=-3.231, b=12.059, dil_factor=25000):
     np.array of floats
         A 2D array of floats
     """
-    qpcr_concentration = np.power(10, ((cp_vals - b) / m)) * dil_factor / 1000
+    # standard curve, computed in place on a float copy of the Cp values
+    qpcr_concentration = np.array(cp_vals, dtype=float)
+    qpcr_concentration -= b
+    qpcr_concentration /= m
+    np.power(10, qpcr_concentration, out=qpcr_concentration)
+    qpcr_concentration *= dil_factor
+    qpcr_concentration /= 1000
 
-    return(qpcr_concentration)
+    return(_column_major(qpcr_concentration))
 
 
 def compute_shotgun_pooling_values_eqvol(sample_concs, total_vol=60.0):
@@ -351,7 +461,7 @@ def compute_shotgun_pooling_values_eqvol(sample_concs, total_vol=60.0):
 
     sample_vols = np.zeros(sample_concs.shape) + per_sample_vol
 
-    return(sample_vols)
+    return(_column_major(sample_vols))
 
 
 def compute_shotgun_pooling_values_qpcr(sample_concs, sample_fracs=None,
@@ -395,27 +505,26 @@ def compute_shotgun_pooling_values_qpcr(sample_concs, sample_fracs=None,
         the volumes in nL per each sample pooled
     """
 
+    sample_concs = np.asarray(sample_concs, dtype=np.float64)
+
     if sample_fracs is None:
         sample_fracs = np.ones(sample_concs.shape) / sample_concs.size
 
     # get samples above threshold
-    sample_fracs_pass = sample_fracs.copy()
-    sample_fracs_pass[sample_concs <= min_conc] = 0
+    sample_fracs_pass = np.where(sample_concs <= min_conc, 0.0, sample_fracs)
 
     # renormalize to exclude lost samples
     sample_fracs_pass *= 1/sample_fracs_pass.sum()
 
-    # floor concentration value
-    sample_concs_floor = sample_concs.copy()
-    sample_concs_floor[sample_concs < floor_conc] = floor_conc
-
     # calculate volumetric fractions including floor val
-    sample_vols = (total_nmol * sample_fracs_pass) / sample_concs_floor
+    sample_vols = sample_fracs_pass
+    sample_vols *= total_nmol
+    sample_vols /= np.maximum(sample_concs, floor_conc)
 
     # convert L to nL
     sample_vols *= 10**9
 
-    return(sample_vols)
+    return(_column_major(sample_vols))
 
 
 def compute_shotgun_pooling_values_qpcr_minvol(sample_concs, sample_fracs=None,
@@ -463,6 +572,8 @@ def compute_shotgun_pooling_values_qpcr_minvol(sample_concs, sample_fracs=None,
         the volumes in nL per each sample pooled
     """
 
+    sample_concs = np.asarray(sample_concs, dtype=np.float64)
+
     if sample_fracs is None:
         sample_fracs = np.ones(sample_concs.shape) / sample_concs.size
 
@@ -475,7 +586,7 @@ def compute_shotgun_pooling_values_qpcr_minvol(sample_concs, sample_fracs=None,
     # drop volumes for samples below floor concentration to floor_vol
     sample_vols[sample_concs < floor_conc] = floor_vol
 
-    return(sample_vols)
+    return(_column_major(sample_vols))
 
 
 def estimate_pool_conc_vol(sample_vols, sample_concs):
@@ -511,6 +622,39 @@ def estimate_pool_conc_vol(sample_vols, sample_concs):
     return(pool_conc, total_vol)
 
 
+@njit(cache=True)
+def _assign_pooling_destinations(pool_vols, max_vol_per_well):
+    """Assigns each sample, in order, to a numbered destination well
+
+    Parameters
+    ----------
+    pool_vols : 1d numpy array of floats
+        The per well sample volume, in nL
+    max_vol_per_well : float
+        Maximum destination well volume, in nL
+
+    Returns
+    -------
+    np.array of int
+        The destination well number for each sample, starting at 1
+    """
+    dests = np.empty(pool_vols.size, dtype=np.int64)
+
+    running_tot = 0.0
+    d = 1
+    for k in range(pool_vols.size):
+        # test to see if we will exceed total vol per well
+        if running_tot + pool_vols[k] > max_vol_per_well:
+            d += 1
+            running_tot = pool_vols[k]
+        else:
+            running_tot += pool_vols[k]
+
+        dests[k] = d
+
+    return dests
+
+
 def format_pooling_echo_pick_list(vol_sample,
                                   max_vol_per_well=60000,
                                   dest_plate_shape=[16, 24]):
@@ -523,44 +667,40 @@ def format_pooling_echo_pick_list(vol_sample,
     max_vol_per_well : 2d numpy array of floats
         Maximum destination well volume, in nL
     """
-    contents = ['Source Plate Name,Source Plate Type,Source Well,'
-                'Concentration,Transfer Volume,Destination Plate Name,'
-                'Destination Well']
     # Write the sample transfer volumes
     rows, cols = vol_sample.shape
 
     # replace NaN values with 0s to leave a trail of unpooled wells
-    pool_vols = np.nan_to_num(vol_sample)
+    pool_vols = np.nan_to_num(np.asarray(vol_sample, dtype=float)).ravel()
 
-    running_tot = 0
-    d = 1
-    for i in range(rows):
-        for j in range(cols):
-            well_name = "%s%d" % (chr(ord('A') + i), j+1)
-            # Machine will round, so just give it enough info to do the
-            # correct rounding.
-            val = "%.2f" % pool_vols[i][j]
+    # source well names for the whole plate, in row-major order
+    row_names = (np.arange(rows) + ord('A')).astype(np.uint32).view('U1')
+    col_names = (np.arange(cols) + 1).astype(str)
+    wells = np.char.add(row_names[:, None], col_names[None, :]).ravel()
 
-            # test to see if we will exceed total vol per well
-            if running_tot + pool_vols[i][j] > max_vol_per_well:
-                d += 1
-                running_tot = pool_vols[i][j]
-            else:
-                running_tot += pool_vols[i][j]
+    d = _assign_pooling_destinations(pool_vols, max_vol_per_well)
+    dest_rows = (d // dest_plate_shape[0] + ord('A')).astype(np.uint32)
+    dests = np.char.add(dest_rows.view('U1'),
+                        (d % dest_plate_shape[1]).astype(str))
 
-            dest = "%s%d" % (chr(ord('A') +
-                                 int(np.floor(d/dest_plate_shape[0]))),
-                             (d % dest_plate_shape[1]))
+    contents = pd.DataFrame({'Source Plate Name': '1',
+                             'Source Plate Type': '384LDV_AQ_B2_HT',
+                             'Source Well': wells,
+                             'Concentration': '',
+                             'Transfer Volume': pool_vols,
+                             'Destination Plate Name': 'NormalizedDNA',
+                             'Destination Well': dests})
 
-            contents.append(
-                ",".join(['1', '384LDV_AQ_B2_HT', well_name, "",
-                          val, 'NormalizedDNA', dest]))
+    # Machine will round, so just give it enough info to do the correct
+    # rounding.
+    contents = contents.to_csv(index=False, float_format='%.2f',
+                               lineterminator='\n')
 
-    return "\n".join(contents)
+    return contents.rstrip('\n')
 
 
 def plot_plate_vals(dataset, color_map='YlGnBu', annot_str=None,
-                    annot_fmt='.5s'):
+                    annot_fmt='.5s', fig=None, fast=False):
     """
     Plots values in a plate format. Returns a heatmap in the shape of the
     plate, with bar graphs aligned to the rows and columns showing the mean and
@@ -581,14 +721,25 @@ def plot_plate_vals(dataset, color_map='YlGnBu', annot_str=None,
     annot_fmt: str
         string formatting values for annotations. Defaults to first 5 char per
         well.
+    fig: matplotlib Figure
+        figure to draw on, it is cleared before plotting. Defaults to a new
+        20 x 20 inch figure.
+    fast: bool
+        skip the per-well annotations and draw a plain histogram instead of a
+        density plot. Rendering the annotations dominates the plotting time
+        for 384 well plates, so this is useful when making many plots.
 
     Returns
     -------
     """
-    plt.figure(figsize=(20, 20))
+    if fig is None:
+        fig = plt.figure(figsize=(20, 20))
+    else:
+        fig.clf()
 
     with sns.axes_style("white"):
-        ax1 = plt.subplot2grid((40, 20), (20, 0), colspan=18, rowspan=18)
+        ax1 = plt.subplot2grid((40, 20), (20, 0), colspan=18, rowspan=18,
+                               fig=fig)
         ax1.xaxis.tick_top()
         if annot_str is None:
             sns.heatmap(dataset,
@@ -597,7 +748,7 @@ def plot_plate_vals(dataset, color_map='YlGnBu', annot_str=None,
                         yticklabels=list(string.ascii_uppercase)[
                             0:dataset.shape[0]],
                         # square = True,
-                        annot=True,
+                        annot=not fast,
                         fmt='.0f',
                         cmap=color_map,
                         cbar=False)
@@ -608,15 +759,17 @@ def plot_plate_vals(dataset, color_map='YlGnBu', annot_str=None,
                         yticklabels=list(string.ascii_uppercase)[
                             0:dataset.shape[0]],
                         # square = True,
-                        annot=annot_str,
+                        annot=False if fast else annot_str,
                         fmt=annot_fmt,
                         cmap=color_map,
                         cbar=False)
 
     with sns.axes_style("white"):
-        ax2 = plt.subplot2grid((40, 20), (38, 0), colspan=18, rowspan=2)
-        ax3 = plt.subplot2grid((40, 20), (20, 18), colspan=2, rowspan=18)
-        sns.despine()
+        ax2 = plt.subplot2grid((40, 20), (38, 0), colspan=18, rowspan=2,
+                               fig=fig)
+        ax3 = plt.subplot2grid((40, 20), (20, 18), colspan=2, rowspan=18,
+                               fig=fig)
+        sns.despine(fig=fig)
         sns.barplot(data=dataset, orient='v', ax=ax2, color='grey')
         sns.barplot(data=dataset.transpose(), orient='h', ax=ax3,
                     color='grey')
@@ -624,14 +777,19 @@ def plot_plate_vals(dataset, color_map='YlGnBu', annot_str=None,
         ax3.set(xticklabels=[], yticklabels=[])
 
     with sns.axes_style():
-        ax4 = plt.subplot2grid((40, 20), (0, 0), colspan=18, rowspan=18)
-        sns.distplot(dataset.flatten()[~np.isnan(dataset.flatten())], ax=ax4,
-                     bins=20)
+        ax4 = plt.subplot2grid((40, 20), (0, 0), colspan=18, rowspan=18,
+                               fig=fig)
+        values = dataset.flatten()[~np.isnan(dataset.flatten())]
+        if fast:
+            sns.histplot(values, ax=ax4, bins=20)
+        else:
+            sns.distplot(values, ax=ax4, bins=20)
 
     return
 
 
-def make_2D_array(qpcr, data_col='Cp', well_col='Pos', rows=16, cols=24):
+def make_2D_array(qpcr, data_col='Cp', well_col='Pos', rows=16, cols=24,
+                  dtype=np.float64):
     """
     Pulls a column of data out of a dataframe and puts into array format
     based on well IDs in another column
@@ -648,19 +806,44 @@ def make_2D_array(qpcr, data_col='Cp', well_col='Pos', rows=16, cols=24):
         number of rows in array to return
     cols: int
         number of cols in array to return
+    dtype: numpy float dtype or object
+        type of the array to return. Values are coerced to numbers, with
+        NaN for anything that can't be parsed and for empty wells. Use
+        object to keep non-numeric data such as sample names as is.
 
     Returns
     -------
+
+    Raises
+    ------
+    UserWarning
+        If non-numeric values are set to NaN.
     """
-    # initialize empty Cp array
-    cp_array = np.empty((rows, cols), dtype=object)
+    # initialize empty Cp array, numeric data is kept as floats (with NaN in
+    # the empty wells) so the array can be used directly in calculations
+    if np.dtype(dtype) == object:
+        values = qpcr[data_col].to_numpy()
+        cp_array = np.empty((rows, cols), dtype=object)
+    else:
+        values = pd.to_numeric(qpcr[data_col], errors='coerce')
+
+        n_coerced = values.isna().sum() - qpcr[data_col].isna().sum()
+        if n_coerced:
+            warnings.warn(('%d values in %s are not numeric and were set to '
+                           'NaN, use dtype=object to keep them') %
+                          (n_coerced, data_col))
+
+        values = values.to_numpy(dtype=dtype)
+        cp_array = np.full((rows, cols), np.nan, dtype=dtype)
+
+    # convert the well IDs to row and column indices all at once
+    wells = qpcr[well_col].astype(str)
+    row = wells.str[0].str.upper().map(ord).to_numpy(dtype=int) - ord('A')
+    col = wells.str[1:].astype(int).to_numpy(dtype=int) - 1
 
     # fill Cp array with the post-cleaned values from the right half of the
     # plate
-    for record in qpcr.iterrows():
-        row = ord(str.upper(record[1][well_col][0])) - ord('A')
-        col = int(record[1][well_col][1:]) - 1
-        cp_array[row, col] = record[1][data_col]
+    cp_array[row, col] = values
 
     return(cp_array)
 
@@ -686,6 +869,11 @@ def combine_dfs(qpcr_df, dna_picklist, index_picklist):
     -------
     combined_df: Pandas DataFrame
         new DataFrame with the relevant columns
+
+    Raises
+    ------
+    ValueError
+        If a pick list has more than one row for a destination well.
     """
     combined_df = pd.DataFrame({'Well': qpcr_df['Pos'],
                                 'Cp': qpcr_df['Cp']})
@@ -699,20 +887,33 @@ def combine_dfs(qpcr_df, dna_picklist, index_picklist):
     d = index_picklist.loc[index_picklist['Source Plate Name'] ==
                            'i5 Source Plate', ].set_index('Destination Well')
 
-    # Add DNA conc columns
-    combined_df['DNA Concentration'] = b['Concentration']
-    combined_df['DNA Transfer Volume'] = b['Transfer Volume']
-
-    # Add Index columns
-    combined_df['Sample Name'] = c['Sample Name']
-    combined_df['Plate'] = c['Plate']
-    combined_df['Counter'] = d['Counter']
-    combined_df['Source Well i7'] = c['Source Well']
-    combined_df['Index i7'] = c['Index']
-    combined_df['Primer i7'] = c['Primer']
-    combined_df['Source Well i5'] = d['Source Well']
-    combined_df['Index i5'] = d['Index']
-    combined_df['Primer i5'] = d['Primer']
+    # DNA conc columns
+    b = b[['Concentration', 'Transfer Volume']].add_prefix('DNA ')
+
+    # Index columns
+    c = c[['Sample Name', 'Plate', 'Source Well', 'Index', 'Primer']].rename(
+        columns={'Source Well': 'Source Well i7', 'Index': 'Index i7',
+                 'Primer': 'Primer i7'})
+    d = d[['Counter', 'Source Well', 'Index', 'Primer']].rename(
+        columns={'Source Well': 'Source Well i5', 'Index': 'Index i5',
+                 'Primer': 'Primer i5'})
+
+    # each well can only take one row from every pick list
+    for name, df in (('DNA', b), ('i7', c), ('i5', d)):
+        if not df.index.is_unique:
+            duplicated_wells = df.index[df.index.duplicated()].unique()
+            raise ValueError('The %s pick list has more than one row for '
+                             'the wells %s' %
+                             (name, ', '.join(map(str, duplicated_wells))))
+
+    # a single join aligns all of the columns against the qPCR wells
+    combined_df = combined_df.join([b, c, d], how='left')
+
+    combined_df = combined_df[['Cp', 'DNA Concentration',
+                               'DNA Transfer Volume', 'Sample Name', 'Plate',
+                               'Counter', 'Source Well i7', 'Index i7',
+                               'Primer i7', 'Source Well i5', 'Index i5',
+                               'Primer i5']]
 
     combined_df.reset_index(inplace=True)
 
@@ -757,9 +958,11 @@ def compute_pico_concentration(dna_vals, size=400):
     np.array of floats
         A 2D array of floats
     """
+    dna_vals = np.asarray(dna_vals, dtype=np.float64)
+
     lib_concentration = (dna_vals / (660 * float(size))) * 10**6
 
-    return(lib_concentration)
+    return(_column_major(lib_concentration))
 
 
 def bcl_scrub_name(name):
@@ -776,16 +979,14 @@ def bcl_scrub_name(name):
         the sample name, formatted for bcl2fastq
     """
 
-    return re.sub(r'[^0-9a-zA-Z\-\_]+', '_', name)
+    return _BCL_SCRUB_PATTERN.sub('_', name)
 
 
 def rc(seq):
     """
     from http://stackoverflow.com/a/25189185/7146785
     """
-    complement = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A'}
-
-    rev_seq = "".join(complement.get(base, base) for base in reversed(seq))
+    rev_seq = seq.translate(_RC_TABLE)[::-1]
 
     return(rev_seq)
 
@@ -834,29 +1035,28 @@ def reformat_interleaved_to_columns(wells):
         then new well locations in matching array positions
     """
 
-    wells = np.array(wells)
-    new_wells = np.empty(np.shape(wells), dtype='object')
-
-    for i, owell in np.ndenumerate(wells):
-        row = ord(str(owell[0]).upper()) - 65
-        col = int(owell[1:]) - 1
+    wells = np.asarray(wells).astype(str)
 
-        # ROWS
-        # roffset = ROW % 2
-        # row = ROW - roffset + floor(COL / 12)
+    # decode every well at once; the row letter is the first character and
+    # the column number is whatever follows it
+    row = np.char.upper(wells.astype('U1')).view(np.uint32) - ord('A')
+    col = np.char.lstrip(wells, string.ascii_letters).astype(int) - 1
 
-        roffset = row % 2
-        nrow = int(row - roffset + np.floor(col / 12))
+    # ROWS
+    # roffset = ROW % 2
+    # row = ROW - roffset + floor(COL / 12)
 
-        # COLS
-        # coffset = COL % 2 + (ROW % 2) * 2
-        # col = coffset * 6 + (col / 2) % 6
+    roffset = row % 2
+    nrow = row - roffset + col // 12
 
-        coffset = col % 2 + (row % 2) * 2
-        ncol = int(coffset * 6 + (col / 2) % 6)
+    # COLS
+    # coffset = COL % 2 + (ROW % 2) * 2
+    # col = coffset * 6 + (col / 2) % 6
 
-        nwell = '%s%s' % (chr(nrow + 65), ncol + 1)
+    coffset = col % 2 + roffset * 2
+    ncol = coffset * 6 + (col // 2) % 6
 
-        new_wells[i] = nwell
+    nrow = (nrow + ord('A')).astype(np.uint32).view('U1')
+    new_wells = np.char.add(nrow, (ncol + 1).astype(str)).astype(object)
 
     return(new_wells)
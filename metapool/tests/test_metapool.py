@@ -4,7 +4,9 @@ import pandas as pd
 import numpy as np
 import numpy.testing as npt
 import os
-from io import StringIO
+import warnings
+import matplotlib.pyplot as plt
+from io import StringIO, BytesIO
 
 from metapool.metapool import (read_plate_map_csv, read_pico_csv,
                                calculate_norm_vol, format_dna_norm_picklist,
@@ -15,10 +17,11 @@ from metapool.metapool import (read_plate_map_csv, read_pico_csv,
                                compute_shotgun_pooling_values_qpcr_minvol,
                                estimate_pool_conc_vol,
                                format_pooling_echo_pick_list,
-                               make_2D_array, combine_dfs,
+                               plot_plate_vals, make_2D_array, combine_dfs,
                                add_dna_conc, compute_pico_concentration,
                                bcl_scrub_name, rc, sequencer_i5_index,
-                               reformat_interleaved_to_columns)
+                               reformat_interleaved_to_columns,
+                               _assign_pooling_destinations)
 
 
 class Tests(TestCase):
@@ -138,6 +141,19 @@ class Tests(TestCase):
         with self.assertRaises(Exception):
             read_plate_map_csv(plate_map_f)
 
+        # each name is only reported once, no matter how often it repeats
+        plate_map_csv = (
+            'Sample\tRow\tCol\tBlank\n'
+            'sam2\tA\t1\tFalse\n'
+            'sam2\tA\t2\tFalse\n'
+            'blank1\tB\t1\tTrue\n'
+            'blank1\tB\t2\tTrue\n'
+            'blank1\tB\t3\tTrue\n')
+
+        with self.assertRaisesRegex(ValueError, 'The following sample names '
+                                    'are duplicated blank1, sam2$'):
+            read_plate_map_csv(StringIO(plate_map_csv))
+
     def test_read_pico_csv(self):
         # Test a normal sheet
         pico_csv = '''Results
@@ -189,6 +205,24 @@ class Tests(TestCase):
         pd.testing.assert_frame_equal(
             obs_pico_df, exp_pico_df, check_like=True)
 
+    def test_read_pico_csv_binary_handle(self):
+        pico_csv = (b'Results\n\n'
+                    b'Well ID\tWell\t[Blanked-RFU]\t[Concentration]\n'
+                    b'SPL1\tA1\t5243.000\t3.432\n'
+                    b'SPL2\tA2\t4949.000\t3.239\n'
+                    b'\n'
+                    b'Curve2 Fitting Results\n\n'
+                    b'Curve Name\tCurve Formula\tA\tB\tR2\tFit F Prob\n'
+                    b'Curve2\tY=A*X+B\t1.53E+003\t0\t0.995\t?????\n')
+        exp_pico_df = pd.DataFrame({'Well': ['A1', 'A2'],
+                                    'Sample DNA Concentration':
+                                    [3.432, 3.239]})
+
+        obs_pico_df = read_pico_csv(BytesIO(pico_csv))
+
+        pd.testing.assert_frame_equal(
+            obs_pico_df, exp_pico_df, check_like=True)
+
     def test_read_pico_csv_spectramax(self):
         # Test a normal sheet
         fp_spectramax = os.path.join(os.path.dirname(__file__), 'data',
@@ -213,6 +247,7 @@ class Tests(TestCase):
         obs_vols = calculate_norm_vol(dna_concs)
 
         np.testing.assert_allclose(exp_vols, obs_vols)
+        self.assertTrue(obs_vols.flags.f_contiguous)
 
     def test_format_dna_norm_picklist(self):
 
@@ -347,6 +382,34 @@ class Tests(TestCase):
 
         self.assertEqual(exp_picklist, obs_picklist)
 
+    def test_format_dna_norm_picklist_none(self):
+        # empty wells from make_2D_array(..., dtype=object) are None, these
+        # are written as None, and only NaN values as nan
+        exp_picklist = (
+            'Sample\tSource Plate Name\tSource Plate Type\tSource Well\t'
+            'Concentration\tTransfer Volume\tDestination Plate Name\t'
+            'Destination Well\n'
+            'sam1\tWater\t384PP_AQ_BP2_HT\tA1\t2.0\t1000.0\tNormalizedDNA\t'
+            'A1\n'
+            'None\tWater\t384PP_AQ_BP2_HT\tA2\tnan\t3500.0\tNormalizedDNA\t'
+            'A2\n'
+            'sam1\tSample\t384PP_AQ_BP2_HT\tA1\t2.0\t2500.0\t'
+            'NormalizedDNA\tA1\n'
+            'None\tSample\t384PP_AQ_BP2_HT\tA2\tnan\tNone\t'
+            'NormalizedDNA\tA2')
+
+        dna_vols = np.array([[2500., None]], dtype=object)
+        water_vols = np.array([[1000., 3500.]])
+        wells = np.array([['A1', 'A2']])
+        sample_names = np.array([['sam1', None]], dtype=object)
+        dna_concs = np.array([[2, np.nan]])
+
+        obs_picklist = format_dna_norm_picklist(dna_vols, water_vols, wells,
+                                                sample_names=sample_names,
+                                                dna_concs=dna_concs)
+
+        self.assertEqual(exp_picklist, obs_picklist)
+
     def test_format_index_picklist(self):
         exp_picklist = (
             'Sample\tSource Plate Name\tSource Plate Type\tSource Well\t'
@@ -414,6 +477,7 @@ class Tests(TestCase):
         exp = self.qpcr_conc
 
         npt.assert_allclose(obs, exp)
+        self.assertTrue(obs.flags.f_contiguous)
 
     def test_compute_shotgun_pooling_values_eqvol(self):
         obs_sample_vols = \
@@ -443,6 +507,7 @@ class Tests(TestCase):
         obs_vols = compute_shotgun_pooling_values_qpcr(sample_concs)
 
         npt.assert_allclose(exp_vols, obs_vols)
+        self.assertTrue(obs_vols.flags.f_contiguous)
 
     def test_compute_shotgun_pooling_values_qpcr_minvol(self):
         sample_concs = np.array([[1, 12, 400],
@@ -490,6 +555,20 @@ class Tests(TestCase):
         self.maxDiff = None
         self.assertEqual(exp_str, obs_str)
 
+    def test_assign_pooling_destinations(self):
+        # a well that fills up exactly is not reset, the next sample is
+        exp = np.array([1, 1, 1, 2, 3])
+        for vols, max_vol in [(np.array([2., 2., 1., 4., 4.]), 5.),
+                              (np.array([2, 2, 1, 4, 4]), 5)]:
+            npt.assert_array_equal(
+                _assign_pooling_destinations(vols, max_vol), exp)
+
+            # when numba is installed, check the compiled and the plain
+            # Python versions agree
+            py_func = getattr(_assign_pooling_destinations, 'py_func', None)
+            if py_func is not None:
+                npt.assert_array_equal(py_func(vols, max_vol), exp)
+
     def test_format_pooling_echo_pick_list_nan(self):
         vol_sample = np.array([[10.00, 10.00, np.nan, 5.00, 10.00, 10.00]])
 
@@ -512,6 +591,19 @@ class Tests(TestCase):
         self.maxDiff = None
         self.assertEqual(exp_str, obs_str)
 
+    def test_plot_plate_vals_fast(self):
+        fig = plt.figure()
+
+        # draw twice to make sure the figure is reused and cleared
+        plot_plate_vals(self.dna_vals, fig=fig, fast=True)
+        plot_plate_vals(self.dna_vals, fig=fig, fast=True)
+
+        self.assertEqual(len(fig.axes), 4)
+        # no per-well annotations on the heatmap
+        self.assertEqual(len(fig.axes[0].texts), 0)
+
+        plt.close(fig)
+
     def test_make_2D_array(self):
         example_qpcr_df = pd.DataFrame({'Cp': [12, 0, 5, np.nan],
                                         'Pos': ['A1', 'A2', 'A3', 'A4']})
@@ -531,7 +623,40 @@ class Tests(TestCase):
         np.testing.assert_allclose(make_2D_array(
             example2_qpcr_df, rows=2, cols=4).astype(float), exp2_cp_array)
 
-    def combine_dfs(self):
+        # numeric data is returned as floats, empty wells are NaN
+        obs = make_2D_array(example_qpcr_df, rows=2, cols=4)
+        self.assertEqual(obs.dtype, np.float64)
+        self.assertTrue(np.isnan(obs[1]).all())
+
+        # values that aren't numbers are coerced to NaN
+        example3_qpcr_df = pd.DataFrame({'Cp': ['12', 'foo'],
+                                         'Pos': ['A1', 'A2']})
+        with self.assertWarnsRegex(UserWarning, '1 values in Cp are not '
+                                   'numeric and were set to NaN'):
+            obs = make_2D_array(example3_qpcr_df, rows=1, cols=2)
+        np.testing.assert_allclose(obs, np.array([[12.0, np.nan]]))
+
+        # object arrays keep the values as is
+        example_names_df = pd.DataFrame({'Sample': ['sam1', 'sam2'],
+                                         'Pos': ['A1', 'B2']})
+        exp_names = np.array([['sam1', None], [None, 'sam2']], dtype=object)
+        np.testing.assert_array_equal(
+            make_2D_array(example_names_df, data_col='Sample', rows=2,
+                          cols=2, dtype=object), exp_names)
+
+        # without it they are lost, which is warned about
+        with self.assertWarnsRegex(UserWarning, '2 values in Sample are not '
+                                   'numeric'):
+            make_2D_array(example_names_df, data_col='Sample', rows=2,
+                          cols=2)
+
+        # missing values are not counted as coerced
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            make_2D_array(example_qpcr_df, rows=1, cols=4)
+        self.assertEqual(caught, [])
+
+    def test_combine_dfs(self):
         test_index_picklist_f = (
             '\tWell Number\tPlate\tSample Name\tSource Plate Name\t'
             'Source Plate Type\tCounter\tPrimer\tSource Well\tIndex\t'
@@ -557,19 +682,23 @@ class Tests(TestCase):
             '5\t1\t384LDV_AQ_B2_HT\tA1\t12.751753\t80.0\tNormalizedDNA\tA1\n'
             '6\t1\t384LDV_AQ_B2_HT\tC1\t17.582063\t57.5\tNormalizedDNA\tC1')
 
+        # E1 is in the qPCR run but in neither of the pick lists
         test_qpcr_f = (
-            '\tInclude\tColor\tPos\tName\tCp\tConcentration\tStandard\tStatus'
-            '0\tTRUE\t255\tA1\tSample 1\t20.55\tNaN\t0\tNaN'
-            '1\tTRUE\t255\tC1\tSample 2\t9.15\tNaN\t0\tNaN')
+            '\tInclude\tColor\tPos\tName\tCp\tConcentration\tStandard\t'
+            'Status\n'
+            '0\tTRUE\t255\tA1\tSample 1\t20.55\tNaN\t0\tNaN\n'
+            '1\tTRUE\t255\tC1\tSample 2\t9.15\tNaN\t0\tNaN\n'
+            '2\tTRUE\t255\tE1\tSample 3\t31.2\tNaN\t0\tNaN')
 
         exp_out_f = (
             'Well\tCp\tDNA Concentration\tDNA Transfer Volume\tSample Name\t'
             'Plate\tCounter\tPrimer i7\tSource Well i7\tIndex i7\tPrimer i5\t'
-            'Source Well i5\tIndex i5'
+            'Source Well i5\tIndex i5\n'
             'A1\t20.55\t12.751753\t80.0\t8_29_13_rk_rh\tABTX_35\t1841.0\t'
-            'iTru7_110_05\tA23\tCGCTTAAC\tiTru5_01_G\tG1\tGTTCCATG'
+            'iTru7_110_05\tA23\tCGCTTAAC\tiTru5_01_G\tG1\tGTTCCATG\n'
             'C1\t9.15\t17.582063\t57.5\t8_29_13_rk_lh\tABTX_35\t1842.0\t'
-            'iTru7_110_06\tB23\tCACCACTA\tiTru5_01_H\tH1\tTAGCTGAG')
+            'iTru7_110_06\tB23\tCACCACTA\tiTru5_01_H\tH1\tTAGCTGAG\n'
+            'E1\t31.2\t\t\t\t\t\t\t\t\t\t\t')
 
         test_index_picklist_df = pd.read_csv(
             StringIO(test_index_picklist_f), header=0, sep='\t')
@@ -583,6 +712,24 @@ class Tests(TestCase):
             test_qpcr_df, test_dna_picklist_df, test_index_picklist_df)
 
         pd.testing.assert_frame_equal(combined_df, exp_df, check_like=True)
+        self.assertEqual(combined_df['Cp'].tolist(), [20.55, 9.15, 31.2])
+        self.assertTrue(combined_df.drop(columns=['Well', 'Cp'])
+                        .iloc[2].isna().all())
+
+        # a well can't take two rows from the same pick list
+        dup_dna_picklist_df = pd.concat(
+            [test_dna_picklist_df, test_dna_picklist_df.iloc[[2]]])
+        with self.assertRaisesRegex(ValueError, 'The DNA pick list has more '
+                                    'than one row for the wells A1$'):
+            combine_dfs(test_qpcr_df, dup_dna_picklist_df,
+                        test_index_picklist_df)
+
+        dup_index_picklist_df = pd.concat(
+            [test_index_picklist_df, test_index_picklist_df.iloc[[1]]])
+        with self.assertRaisesRegex(ValueError, 'The i5 pick list has more '
+                                    'than one row for the wells C1$'):
+            combine_dfs(test_qpcr_df, test_dna_picklist_df,
+                        dup_index_picklist_df)
 
     def test_add_dna_conc(self):
         test_dna = 'Well\tpico_conc\nA1\t2.5\nC1\t20'
@@ -618,6 +765,7 @@ class Tests(TestCase):
         exp = self.pico_conc
 
         npt.assert_allclose(obs, exp)
+        self.assertTrue(obs.flags.f_contiguous)
 
     def test_bcl_scrub_name(self):
         self.assertEqual('test_1', bcl_scrub_name('test.1'))
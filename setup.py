@@ -8,61 +8,32 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from setuptools import find_packages, setup
-
-import versioneer
-
-classifiers = [
-    'Development Status :: 2 - Pre-Alpha',
-    'License :: OSI Approved :: MIT License',
-    'Environment :: Console',
-    'Topic :: Software Development :: Libraries :: Application Frameworks',
-    'Topic :: Scientific/Engineering',
-    'Topic :: Scientific/Engineering :: Bio-Informatics',
-    'Programming Language :: Python',
-    'Programming Language :: Python :: 3',
-    'Programming Language :: Python :: 3.5',
-    'Programming Language :: Python :: 3.6',
-    'Operating System :: Unix',
-    'Operating System :: POSIX',
-    'Operating System :: MacOS :: MacOS X',
-    'Operating System :: Microsoft :: Windows']
-
-
-description = 'Metagenomics pooling Jupyter notebook helper'
-
-with open('README.md') as f:
-    long_description = f.read()
-
-keywords = 'microbiome wetlab bioinformatics',
-
-base = ['numpy', 'pandas', 'matplotlib >= 2.0', 'seaborn >= 0.7.1', 'click',
-        'sample_sheet', 'openpyxl']
-test = ["nose", "pep8", "flake8"]
-coverage = ['coverage']
-notebook = ['jupyter', 'notebook', 'jupyter_contrib_nbextensions', 'watermark']
-all_deps = base + test + coverage + notebook
-
-setup(name='metapool',
-      version=versioneer.get_version(),
-      cmdclass=versioneer.get_cmdclass(),
-      license='MIT',
-      description=description,
-      long_description=long_description,
-      keywords=keywords,
-      classifiers=classifiers,
-      author="Jon Sanders",
-      maintainer="Jon Sanders",
-      url='https://github.com/tanaes/metagenomics_pooling_notebook',
-      test_suite='nose.collector',
-      packages=find_packages(),
-      package_data={
-        'metapool': ['data/*.tsv', 'data/*.xlsx', 'tests/data/*.csv']},
-      install_requires=base,
-      extras_require={'test': test,
-                      'coverage': coverage,
-                      'all': all_deps},
-      entry_points='''
-          [console_scripts]
-          seqpro=metapool.scripts.seqpro:format_preparation_files
-      ''')
+# The package metadata lives in pyproject.toml, this file only provides the
+# version, which is the one field that can't be declared statically.
+
+import os
+import runpy
+import sys
+
+from setuptools import setup
+
+
+# Only a git checkout needs versioneer to work out the version, which shells
+# out to git. Release tarballs ship a _version.py that versioneer has already
+# rewritten with the version baked in, so read that directly without
+# importing the package or its dependencies.
+if os.path.exists('.git'):
+    # PEP 517 builds don't put the project directory on the path, which is
+    # where the vendored copy of versioneer lives
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import versioneer
+
+    version = versioneer.get_version()
+    cmdclass = versioneer.get_cmdclass()
+else:
+    _version = runpy.run_path(os.path.join('metapool', '_version.py'))
+    version = _version['get_versions']()['version']
+    cmdclass = {}
+
+setup(version=version,
+      cmdclass=cmdclass)